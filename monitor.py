@@ -3,11 +3,23 @@
 # and send notifications to a Discord channel.
 
 import requests
+import orjson
 import json
 import os
 import sys
 import time
 import argparse
+import hashlib
+import logging
+import math
+import signal
+import socket
+import threading
+from collections import deque
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+from requests.utils import select_proxy
+from urllib3.util.connection import allowed_gai_family
 
 # --- CONFIGURATION ---
 # These are the settings you might need to change.
@@ -25,9 +37,30 @@ DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL", "YOUR_DISCORD_WEBHOOK_URL
 
 # Get the directory where the script is located to ensure the state file is always in the same place.
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-# The name of the file used to store the ID of the last report we've seen.
+# The name of the file used to store the IDs of recent reports and the newest disclosure time we've seen.
 STATE_FILE = os.path.join(BASE_DIR, "last_disclosed_id.txt")
 
+# How long to wait between checks when running continuously, in seconds.
+# Disclosures tend to arrive in bursts, so right after new reports are found we check again
+# after MIN_POLL_INTERVAL (1 minute). Every check that finds nothing doubles the wait,
+# up to MAX_POLL_INTERVAL (1 hour).
+MIN_POLL_INTERVAL = 60
+MAX_POLL_INTERVAL = 3600
+
+# Discord allows at most this many embeds in a single webhook message.
+MAX_EMBEDS_PER_MESSAGE = 10
+
+# Discord's length limits for an embed title and an embed field value. A single embed over
+# these limits makes Discord reject the whole message, so longer text is shortened.
+EMBED_TITLE_LIMIT = 256
+EMBED_FIELD_VALUE_LIMIT = 1024
+
+# How many times to retry a Discord message that was rejected with "429 Too Many Requests".
+MAX_DISCORD_RETRIES = 3
+
+# How many recently processed report IDs to remember in the state file.
+SEEN_IDS_LIMIT = 50
+
 # Standard headers to make our script look like a regular web browser when it talks to HackerOne's API.
 HEADERS = {
     "Content-Type": "application/json",
@@ -37,17 +70,21 @@ HEADERS = {
 
 # This is the GraphQL query. It's like a specific API request that asks HackerOne for exactly the data we need:
 # the 10 most recent, publicly disclosed reports, ordered by when they were disclosed.
+# The $since variable limits the results to reports disclosed at or after the newest one we've seen,
+# so a check with nothing new transfers (and parses) only that report instead of 10.
+# Reports disclosed at the same moment are all returned and told apart by their IDs.
 QUERY = """
-query {
+query ($since: DateTime) {
   reports(
     first: 10,
-    where: { disclosed_at: { _is_null: false } },
+    where: { disclosed_at: { _is_null: false, _gte: $since } },
     order_by: { field: disclosed_at, direction: DESC }
   ) {
     nodes {
       _id
       title
       url
+      disclosed_at
       severity {
         rating
       }
@@ -59,6 +96,231 @@ query {
 }
 """
 
+# The start of the JSON request body, serialized once. fetch_hacktivity() only has to append
+# the $since value and the closing braces: {"query": QUERY, "variables": {"since": ...}}
+_GRAPHQL_BODY_PREFIX = b'{"query":' + orjson.dumps(QUERY) + b',"variables":{"since":'
+
+# The value sent as $since when we don't know the disclosure time of the last report yet.
+# It's earlier than any report, so the query returns the newest ones as usual.
+EPOCH = "1970-01-01T00:00:00Z"
+
+class PinnedDNSAdapter(requests.adapters.HTTPAdapter):
+    """
+    Transport adapter that looks up a host's IP addresses once and then reuses them.
+    
+    Without this, every new connection resolves the hostname again, which costs a full
+    DNS round trip on systems without a caching resolver (containers, minimal images).
+    Requests are sent to a saved IP address, while the Host header, TLS SNI and
+    certificate check still use the real hostname. After a connection error the next
+    address is tried, just like urllib3 does on its own, and once all of them have
+    failed the host is looked up again in case it has moved.
+    
+    Requests that go through a proxy are left alone: the proxy does its own DNS lookup,
+    and the tunnel has to be opened to the real hostname for the certificate check.
+    """
+
+    def __init__(self, hostname, **kwargs):
+        self.hostname = hostname
+        self._addresses = []
+        self._index = 0
+        self._lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        # Present the real hostname for SNI and check the certificate against it,
+        # even though we connect to an IP address.
+        kwargs["server_hostname"] = self.hostname
+        kwargs["assert_hostname"] = self.hostname
+        super().init_poolmanager(*args, **kwargs)
+
+    def resolve(self):
+        """
+        Returns the saved IP address of the host to use next, looking it up if needed.
+        
+        Only address families urllib3 would use are kept (no IPv6 on systems without it).
+        
+        Returns:
+            str: The IP address (in brackets for IPv6), or None if the lookup failed.
+        """
+        with self._lock:
+            if not self._addresses:
+                try:
+                    info = socket.getaddrinfo(self.hostname, 443, allowed_gai_family(), socket.SOCK_STREAM)
+                except socket.gaierror:
+                    return None
+                for family, _, _, _, sockaddr in info:
+                    address = f"[{sockaddr[0]}]" if family == socket.AF_INET6 else sockaddr[0]
+                    if address not in self._addresses:
+                        self._addresses.append(address)
+                self._index = 0
+            return self._addresses[self._index] if self._addresses else None
+
+    def skip_address(self, address):
+        """
+        Moves on to the next saved address after `address` failed to connect.
+        
+        When every address has been tried, they are all forgotten so the host is looked up again.
+        
+        Args:
+            address (str): The address that failed.
+        """
+        with self._lock:
+            if self._addresses and self._addresses[self._index] == address:
+                self._index += 1
+                if self._index >= len(self._addresses):
+                    self._addresses = []
+                    self._index = 0
+
+    def send(self, request, **kwargs):
+        if select_proxy(request.url, kwargs.get("proxies")):
+            return super().send(request, **kwargs)
+        address = self.resolve()
+        parts = urlsplit(request.url)
+        if address and parts.hostname == self.hostname:
+            netloc = address if parts.port is None else f"{address}:{parts.port}"
+            request.url = parts._replace(netloc=netloc).geturl()
+            request.headers["Host"] = parts.netloc
+        try:
+            return super().send(request, **kwargs)
+        except requests.exceptions.ConnectionError:
+            # Use the next address next time in case this one can't be reached.
+            if address:
+                self.skip_address(address)
+            raise
+
+def pin_host(url):
+    """
+    Mounts a PinnedDNSAdapter on SESSION for the host of `url`, unless it already has one.
+    
+    Args:
+        url (str): An https:// URL the script will send requests to.
+    """
+    host = urlsplit(url).hostname
+    if not host:
+        return
+    prefix = f"https://{host}/"
+    adapter = SESSION.get_adapter(prefix)
+    if not (isinstance(adapter, PinnedDNSAdapter) and adapter.hostname == host):
+        SESSION.mount(prefix, PinnedDNSAdapter(host))
+
+# A single HTTP session shared by the whole script. Keeping it at module level means
+# the TCP/TLS connections to HackerOne and Discord stay open (keep-alive) between
+# checks, so we don't pay for a fresh handshake every time the loop comes around.
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+# Resolve HackerOne and Discord only once instead of on every new connection.
+# run_monitor() does the same for a webhook URL given in its Config.
+pin_host(H1_GRAPHQL_URL)
+pin_host(DISCORD_WEBHOOK_URL)
+
+# Discord tells us in its response headers when the webhook's rate limit resets.
+# We remember that moment here (on the time.monotonic() clock) and wait for it
+# before the next send.
+_next_allowed = 0.0
+
+# Set when the script is asked to stop (Ctrl+C or SIGTERM). The main loop waits on this
+# event between checks, so it sleeps without waking up and still exits immediately.
+_shutdown = threading.Event()
+
+# The Discord embed for a report, as pre-built JSON. It creates a rich "embed" with a title,
+# link, color (3447003 is a nice blue) and fields. build_embed() fills in the %s placeholders
+# with the report's title, URL, program, severity and ID.
+_EMBED_TEMPLATE = (
+    b'{"title":"New Disclosure: %s","url":"%s","color":3447003,"fields":['
+    b'{"name":"Program","value":"%s","inline":true},'
+    b'{"name":"Severity","value":"%s","inline":true},'
+    b'{"name":"Report ID","value":"#%s","inline":true}],'
+    b'"footer":{"text":"HackerOne Monitor"}}'
+)
+
+# Translation table that deletes the characters with special meaning in Discord markdown: *, _, `, |, >, ~
+# Built once so sanitize_input() can strip them all in a single pass over the text.
+_MD_STRIP = str.maketrans("", "", "*_`|>~")
+
+# The logger used for all of the script's output.
+log = logging.getLogger("h1mon")
+
+# --- RUNTIME CONFIGURATION ---
+
+@dataclass(slots=True)
+class Config:
+    """
+    The settings a monitor run uses. Each one defaults to the matching constant above,
+    so `Config()` behaves exactly like the script did before; pass other values to
+    run a monitor with, for example, a different webhook or state file.
+    
+    Attributes:
+        webhook_url (str): The Discord webhook URL to send notifications to.
+        state_file (str): Path of the file that stores the processed reports.
+        min_poll_interval (int): Shortest wait between checks, in seconds. Must be positive.
+        max_poll_interval (int): Longest wait between checks, in seconds.
+                                 Must not be less than min_poll_interval.
+    
+    Raises:
+        ValueError: If the polling interval bounds are invalid.
+    """
+    webhook_url: str = DISCORD_WEBHOOK_URL
+    state_file: str = STATE_FILE
+    min_poll_interval: int = MIN_POLL_INTERVAL
+    max_poll_interval: int = MAX_POLL_INTERVAL
+
+    def __post_init__(self):
+        # The polling backoff needs a positive starting interval that is not above the cap.
+        if self.min_poll_interval <= 0:
+            raise ValueError("min_poll_interval must be greater than 0.")
+        if self.max_poll_interval < self.min_poll_interval:
+            raise ValueError("max_poll_interval must not be less than min_poll_interval.")
+
+@dataclass(slots=True)
+class Report:
+    """
+    A disclosed report, with every field already cleaned up and ready to display.
+    
+    Attributes:
+        id (str): The HackerOne report ID.
+        title (str): The sanitized report title.
+        url (str): The full URL of the report.
+        team (str): The sanitized handle of the program the report belongs to.
+        severity (str): The capitalized severity rating, or "N/A".
+        disclosed_at (str): When the report was disclosed, or None if unknown.
+    """
+    id: str
+    title: str
+    url: str
+    team: str
+    severity: str
+    disclosed_at: str | None = None
+
+    @classmethod
+    def from_node(cls, node):
+        """
+        Builds a Report from a report object in HackerOne's GraphQL response.
+        
+        Missing or empty fields are replaced with sensible defaults here, once,
+        so the rest of the script never has to check for them.
+        
+        Args:
+            node (dict): A single report object from the API response.
+            
+        Returns:
+            Report: The parsed report.
+        """
+        # Make sure the URL is a full, valid URL.
+        raw_url = node.get("url") or ""
+        url = raw_url if raw_url.startswith("http") else f"https://hackerone.com{raw_url}"
+
+        # Safely get the severity rating.
+        rating = (node.get("severity") or {}).get("rating")
+
+        return cls(
+            id=str(node.get("_id")),
+            title=sanitize_input(node.get("title") or "No Title"),
+            url=url,
+            team=sanitize_input((node.get("team") or {}).get("handle") or "N/A"),
+            severity=rating.capitalize() if rating else "N/A",
+            disclosed_at=node.get("disclosed_at"),
+        )
+
 # --- FUNCTIONS ---
 
 def sanitize_input(text):
@@ -73,176 +335,375 @@ def sanitize_input(text):
     """
     if not isinstance(text, str):
         return text
-    # Characters to escape: *, _, `, |, >, ~
-    return text.replace('*', '').replace('_', '').replace('`', '').replace('|', '').replace('>', '').replace('~', '')
+    return text.translate(_MD_STRIP)
 
-def fetch_hacktivity():
+def fetch_hacktivity(since=None, previous_hash=None):
     """
     Fetches the latest disclosed reports from HackerOne's GraphQL API.
     
     This function sends the QUERY to HackerOne and processes the response.
     It handles potential network errors and API errors.
     
+    Args:
+        since (str): Only return reports disclosed at or after this timestamp.
+                     If None, the newest reports are returned.
+        previous_hash (bytes): Fingerprint of the last response the caller processed,
+                               as returned by the previous call, or None.
+    
     Returns:
-        A list of report objects (as dictionaries), or None if an error occurs.
+        A tuple of (reports, body_hash). `reports` is a list of Report objects, newest
+        first, or None if an error occurs. It is empty when nothing was disclosed since
+        `since`, or when the response is identical to the previous one (so it holds
+        nothing new). `body_hash` is the fingerprint to pass in on the next call.
     """
-    print("[*] Fetching latest disclosures from HackerOne...")
-    payload = {"query": QUERY}
+    log.debug("Fetching latest disclosures from HackerOne...")
+    # Only the $since value changes between checks, so it is spliced into the pre-serialized query.
+    body = _GRAPHQL_BODY_PREFIX + orjson.dumps(since or EPOCH) + b"}}"
     try:
         # Send the request to the API.
-        response = requests.post(H1_GRAPHQL_URL, json=payload, headers=HEADERS, timeout=10)
+        # orjson is used to parse the response because it is much faster than the standard json module.
+        response = SESSION.post(H1_GRAPHQL_URL, data=body, timeout=10)
         # If the response was an error (like 404 or 500), this will raise an exception.
         response.raise_for_status()
-        data = response.json()
+
+        # If HackerOne sent back exactly the same data as last time, every report in it
+        # has already been handled, so we can skip parsing it altogether.
+        body_hash = hashlib.blake2b(response.content, digest_size=16).digest()
+        if body_hash == previous_hash:
+            return [], previous_hash
+        data = orjson.loads(response.content)
         
         # Check if the API itself reported any errors in the data.
         if 'errors' in data:
-            print("[!] An error occurred while querying the GraphQL API.")
-            return None
+            log.error("An error occurred while querying the GraphQL API.")
+            return None, previous_hash
             
         # Extract the list of reports from the nested JSON response.
         nodes = data.get("data", {}).get("reports", {}).get("nodes", [])
-        return nodes
+        return [Report.from_node(node) for node in nodes], body_hash
     except requests.exceptions.RequestException:
         # Handle network-related errors.
-        print("[!] A network error occurred while fetching Hacktivity data.")
-        return None
+        log.error("A network error occurred while fetching Hacktivity data.")
+        return None, previous_hash
+    except orjson.JSONDecodeError:
+        log.error("HackerOne returned a response that isn't valid JSON.")
+        return None, previous_hash
 
-def send_to_discord(report):
+def build_embed(report):
     """
-    Formats a report into a nice-looking Discord embed and sends it via webhook.
+    Formats a report into a nice-looking Discord embed.
+    
+    The embed is produced directly as JSON bytes by filling in _EMBED_TEMPLATE,
+    instead of building a nested dictionary and serializing it. Text is shortened
+    to fit Discord's limits so one long report can't get the whole message rejected.
     
     Args:
-        report (dict): A dictionary containing the details of a single vulnerability report.
+        report (Report): The vulnerability report to announce.
+        
+    Returns:
+        bytes: The embed as a JSON object, ready to be placed in a webhook payload.
     """
-    if not report:
-        return
+    # The template puts "New Disclosure: " in front of the title, which counts towards the limit.
+    title_limit = EMBED_TITLE_LIMIT - len("New Disclosure: ")
+    return _EMBED_TEMPLATE % (
+        json_escape(truncate(report.title, title_limit)),
+        json_escape(report.url),
+        json_escape(truncate(report.team, EMBED_FIELD_VALUE_LIMIT)),
+        json_escape(truncate(report.severity, EMBED_FIELD_VALUE_LIMIT)),
+        json_escape(truncate(report.id, EMBED_FIELD_VALUE_LIMIT - len("#"))),
+    )
+
+def truncate(text, limit):
+    """
+    Shortens a string to at most `limit` characters, ending it with "…" if it was cut.
+    
+    Args:
+        text (str): The string to shorten.
+        limit (int): The maximum number of characters.
+        
+    Returns:
+        str: The string, shortened if needed.
+    """
+    if len(text) <= limit:
+        return text
+    return text[:limit - 1] + "…"
 
-    # --- Data Extraction & Sanitization ---
-    # Pull out the specific details we want from the report object and sanitize them.
-    report_id = report.get("_id")
-    title = sanitize_input(report.get("title", "No Title"))
-    team = sanitize_input(report.get("team", {}).get("handle", "N/A"))
+def json_escape(text):
+    """
+    Escapes a string so it can be placed between quotes inside a JSON document.
     
-    # Make sure the URL is a full, valid URL.
-    raw_url = report.get("url")
-    url = raw_url if raw_url and raw_url.startswith("http") else f"https://hackerone.com{raw_url}"
+    Args:
+        text (str): The string to escape.
+        
+    Returns:
+        bytes: The escaped string, without the surrounding quotes.
+    """
+    return orjson.dumps(text)[1:-1]
+
+def send_batch(webhook_url, embeds):
+    """
+    Sends a group of embeds to Discord in a single webhook message.
     
-    # Safely get the severity rating.
-    severity_obj = report.get("severity")
-    severity = "N/A"
-    if severity_obj and severity_obj.get("rating"):
-        severity = severity_obj.get("rating").capitalize()
-
-    # --- Embed Creation ---
-    # This dictionary defines the structure and content of the Discord message.
-    # It creates a rich "embed" with a title, link, color, and fields.
-    embed = {
-        "title": f"New Disclosure: {title}",
-        "url": url,
-        "color": 3447003,  # A nice blue color
-        "fields": [
-            {"name": "Program", "value": team, "inline": True},
-            {"name": "Severity", "value": severity, "inline": True},
-            {"name": "Report ID", "value": f"#{report_id}", "inline": True}
-        ],
-        "footer": {"text": "HackerOne Monitor"}
-    }
+    Discord accepts up to MAX_EMBEDS_PER_MESSAGE embeds per message, so several
+    reports can be announced with one HTTP request instead of one request each.
+    
+    Args:
+        webhook_url (str): The Discord webhook URL to send the message to.
+        embeds (list): The embeds to send, as built by build_embed().
+    """
+    if not embeds:
+        return
 
-    payload = {"embeds": [embed]}
+    embeds = embeds[:MAX_EMBEDS_PER_MESSAGE]
+    # The embeds are already JSON, so the payload is put together by joining them.
+    payload = b'{"embeds":[' + b",".join(embeds) + b"]}"
     try:
-        # Send the formatted payload to the Discord webhook URL.
-        res = requests.post(DISCORD_WEBHOOK_URL, json=payload, timeout=10)
+        for attempt in range(MAX_DISCORD_RETRIES + 1):
+            # Wait until Discord's rate limit window allows another message.
+            if wait_for_rate_limit():
+                log.warning("Shutdown requested. %d report(s) were not sent to Discord.", len(embeds))
+                return
+            # Send the formatted payload to the Discord webhook URL.
+            res = SESSION.post(webhook_url, data=payload, headers={"Content-Type": "application/json"}, timeout=10)
+            update_rate_limit(res)
+            if res.status_code != 429 or attempt == MAX_DISCORD_RETRIES:
+                break
+            # We were rate limited. Wait as long as Discord asks (doubling it on
+            # each further attempt) and then try again. The wait ends early on shutdown.
+            delay = get_retry_after(res) * (2 ** attempt)
+            log.warning("Discord rate limit hit. Retrying in %.2f seconds...", delay)
+            if _shutdown.wait(timeout=delay):
+                log.warning("Shutdown requested. %d report(s) were not sent to Discord.", len(embeds))
+                return
         res.raise_for_status() # Check for errors from Discord's side.
-        print(f"[+] Successfully sent report #{report_id} to Discord.")
+        log.info("Successfully sent %d report(s) to Discord.", len(embeds))
     except requests.exceptions.RequestException:
-        print(f"[!] A network error occurred while sending a notification to Discord for report #{report_id}.")
+        log.error("A network error occurred while sending %d report(s) to Discord.", len(embeds))
 
-def get_last_id():
+def wait_for_rate_limit():
     """
-    Reads the last processed report ID from our state file.
+    Waits until the Discord webhook's rate limit window allows another message.
+    
+    Returns:
+        bool: True if a shutdown was requested while waiting, False otherwise.
+    """
+    delay = _next_allowed - time.monotonic()
+    if delay > 0:
+        return _shutdown.wait(timeout=delay)
+    return False
+
+def update_rate_limit(response):
+    """
+    Reads Discord's rate limit headers from a webhook response.
+    
+    When no requests are left in the current window, the time at which the
+    window resets is remembered so the next send can wait for it.
+    
+    Args:
+        response (requests.Response): The response returned by Discord.
+    """
+    global _next_allowed
+    remaining = response.headers.get("X-RateLimit-Remaining")
+    reset_after = response.headers.get("X-RateLimit-Reset-After")
+    if remaining is None or reset_after is None:
+        return
+    try:
+        if int(remaining) == 0:
+            _next_allowed = max(_next_allowed, time.monotonic() + float(reset_after))
+    except ValueError:
+        pass
+
+def get_retry_after(response):
+    """
+    Works out how long Discord wants us to wait after a 429 response.
+    
+    Args:
+        response (requests.Response): The 429 response returned by Discord.
+        
+    Returns:
+        float: The number of seconds to wait.
+    """
+    try:
+        return float(orjson.loads(response.content)["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        pass
+    try:
+        return float(response.headers.get("Retry-After", 1))
+    except ValueError:
+        return 1.0
+
+def get_state(state_file):
+    """
+    Reads the recently processed reports from our state file.
     
     This prevents us from sending duplicate notifications every time the script runs.
+    State written by older versions of the script (a single report ID, either as plain
+    text or as JSON) is still accepted.
+    
+    Args:
+        state_file (str): Path of the state file.
     
     Returns:
-        The last seen report ID as a string, or None if the file doesn't exist.
+        A dictionary with "seen", the IDs of recently processed reports (oldest first),
+        and "disclosed_at", the newest disclosure time we've seen (which may be None).
+        Returns None if the file doesn't exist, is empty, or holds no seen IDs.
     """
-    if os.path.exists(STATE_FILE):
-        with open(STATE_FILE, "r") as f:
+    if os.path.exists(state_file):
+        with open(state_file, "r") as f:
             content = f.read().strip()
-            return content if content else None
+        if not content:
+            return None
+        try:
+            state = json.loads(content)
+        except ValueError:
+            state = None
+        if isinstance(state, dict):
+            seen = state.get("seen")
+            if seen is None and state.get("id") is not None:
+                seen = [state.get("id")]
+            # Without any seen IDs there is nothing to compare against, so it's
+            # treated like an empty file.
+            if not isinstance(seen, list) or not seen:
+                return None
+            return {"seen": [str(report_id) for report_id in seen], "disclosed_at": state.get("disclosed_at")}
+        # Plain ID written by an older version of the script.
+        return {"seen": [content], "disclosed_at": None}
     return None
 
-def save_last_id(report_id):
+def save_state(state_file, seen, disclosed_at):
     """
-    Saves the ID of the most recent report we've processed to the state file.
+    Saves the recently processed report IDs and the newest disclosure time to the state file.
+    
+    Only the newest SEEN_IDS_LIMIT IDs are kept so the file stays small.
     
     Args:
-        report_id (str): The ID of the report to save.
+        state_file (str): Path of the state file.
+        seen (iterable): The processed report IDs, oldest first.
+        disclosed_at (str): The disclosure time of the newest report we've seen.
+        
+    Returns:
+        dict: The saved state, in the same form as returned by get_state().
     """
+    recent = deque((str(report_id) for report_id in seen), maxlen=SEEN_IDS_LIMIT)
+    state = {"seen": list(recent), "disclosed_at": disclosed_at}
+    # Write to a temporary file first and then swap it into place. If the script is killed
+    # mid-write, the old state file is left untouched instead of being truncated.
+    tmp_file = state_file + ".tmp"
     try:
-        with open(STATE_FILE, "w") as f:
-            f.write(str(report_id))
+        with open(tmp_file, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, state_file)
     except IOError as e:
-        print(f"[!] Error saving state to {STATE_FILE}: {e}")
+        log.error("Error saving state to %s: %s", state_file, e)
+    return state
 
-def run_monitor(run_once=False):
+def run_monitor(config=None, run_once=False):
     """
     The main execution loop for the monitor.
     
-    It fetches reports, checks for new ones against the last seen ID,
-    sends notifications for new reports, and then updates the last seen ID.
+    It fetches reports disclosed since the last check, picks out the ones whose
+    IDs we haven't seen before, sends notifications for them, and then updates
+    the saved state.
     
     Args:
+        config (Config): The settings to run with. If None, the defaults are used.
         run_once (bool): If True, the loop runs only once and then exits.
                          If False, it runs forever, pausing between checks.
     """
-    print("[*] Starting HackerOne Hacktivity Monitor...")
+    if config is None:
+        config = Config()
+    log.info("Starting HackerOne Hacktivity Monitor...")
+    pin_host(config.webhook_url)
+    # This script is the only thing that writes the state file, so it is read once here and
+    # then kept in memory, rather than being reopened and parsed on every check.
+    state = get_state(config.state_file)
+    # Number of empty checks after which the wait reaches the longest interval.
+    # We start there; the interval only shortens once new reports show up.
+    max_backoff_steps = math.ceil(math.log2(config.max_poll_interval / config.min_poll_interval))
+    consecutive_empty = max_backoff_steps
+    # Fingerprint of the last HackerOne response this run processed. It belongs to this
+    # run, so other monitors in the same process can't make us skip a response.
+    body_hash = None
     while True:
-        nodes = fetch_hacktivity()
-        if nodes:
-            last_seen_id = get_last_id()
-            new_reports = []
-
+        found_new = False
+        # Only ask for reports disclosed since the newest one we've seen.
+        reports, body_hash = fetch_hacktivity(state["disclosed_at"] if state else None, body_hash)
+        if reports is None:
+            log.warning("No reports found or an API error occurred.")
+        elif state is None:
             # On the very first run, the state file won't exist.
-            # We'll initialize it with the ID of the newest report to avoid
-            # spamming the channel with the 10 reports we just fetched.
-            if last_seen_id is None:
-                print(f"[*] First run detected. Initializing with latest report ID: {nodes[0]['_id']}")
-                save_last_id(nodes[0]['_id'])
+            # We'll initialize it with the reports we just fetched to avoid
+            # spamming the channel with all of them.
+            if reports:
+                log.info("First run detected. Initializing with latest report ID: %s", reports[0].id)
+                state = save_state(config.state_file, [report.id for report in reversed(reports)], reports[0].disclosed_at)
             else:
-                # We have a history, so let's find what's new.
-                # Go through the fetched reports one by one.
-                for node in nodes:
-                    # If we find the report we saw last time, stop. Everything after it is old news.
-                    if str(node['_id']) == last_seen_id:
-                        break
-                    # If it's not the one we last saw, it must be new. Add it to our list.
-                    new_reports.append(node)
-                
-                if new_reports:
-                    print(f"[*] Found {len(new_reports)} new reports.")
-                    # We process the reports in reverse order (oldest to newest)
-                    # so the notifications appear in chronological order in Discord.
-                    for report in reversed(new_reports):
-                        send_to_discord(report)
-                    
-                    # After sending all notifications, update the state file to the ID
-                    # of the absolute newest report we just handled.
-                    save_last_id(new_reports[0]['_id'])
-                else:
-                    print(f"[*] No new disclosures. (Last known ID: {last_seen_id})")
+                log.warning("No reports found or an API error occurred.")
         else:
-            print("[!] No reports found or an API error occurred.")
+            # We have a history, so let's find what's new.
+            # Any report whose ID isn't in our list of seen IDs is new. Unlike stopping at
+            # the last seen ID, this still works when reports come back in a different order
+            # (for example when several share the same disclosure time).
+            if state["disclosed_at"] is None:
+                # State saved by an older version of the script only holds the ID of the newest
+                # announced report and no disclosure time, so the newest page was fetched above.
+                # That report and every older one on the page were already announced, so they
+                # are added to the seen IDs, and its disclosure time becomes the cursor.
+                ids = [report.id for report in reports]
+                last_seen_id = state["seen"][-1]
+                if last_seen_id in ids:
+                    index = ids.index(last_seen_id)
+                    state = {
+                        "seen": list(reversed(ids[index + 1:])) + state["seen"],
+                        "disclosed_at": reports[index].disclosed_at,
+                    }
+            seen = set(state["seen"])
+            new_reports = [report for report in reports if report.id not in seen]
+
+            if new_reports:
+                found_new = True
+                log.info("Found %d new reports.", len(new_reports))
+                # We process the reports in reverse order (oldest to newest)
+                # so the embeds appear in chronological order in Discord.
+                # Up to MAX_EMBEDS_PER_MESSAGE embeds share one webhook message, and any
+                # extra messages are sent one after another to keep that order.
+                embeds = [build_embed(report) for report in reversed(new_reports)]
+                for i in range(0, len(embeds), MAX_EMBEDS_PER_MESSAGE):
+                    send_batch(config.webhook_url, embeds[i:i + MAX_EMBEDS_PER_MESSAGE])
+
+                # After sending all notifications, add the new IDs to the state file
+                # and move the cursor to the newest disclosure time we received.
+                new_ids = [report.id for report in reversed(new_reports)]
+                state = save_state(config.state_file, state["seen"] + new_ids, reports[0].disclosed_at or state["disclosed_at"])
+            else:
+                log.info("No new disclosures. (Last known ID: %s)", state["seen"][-1])
 
         # If the --once flag was used, break the loop and exit the script.
         if run_once:
-            print("[*] Run complete.")
+            log.info("Run complete.")
+            break
+
+        # If not running once, wait before checking again. The wait is short right after
+        # new reports were found and grows with each check that finds nothing.
+        # It ends early if a shutdown is requested.
+        consecutive_empty = 0 if found_new else min(consecutive_empty + 1, max_backoff_steps)
+        interval = min(config.max_poll_interval, config.min_poll_interval * 2 ** consecutive_empty)
+        log.debug("Waiting for %d seconds before the next check...", interval)
+        if _shutdown.wait(timeout=interval):
+            log.info("Shutdown requested. Exiting.")
             break
 
-        # If not running once, wait for 1 hour before checking again.
-        print("[*] Waiting for 1 hour before the next check...")
-        time.sleep(3600)
+def handle_shutdown(signum, frame):
+    """
+    Signal handler that asks the main loop to stop.
+    
+    Args:
+        signum (int): The number of the received signal.
+        frame: The current stack frame (unused).
+    """
+    _shutdown.set()
 
 # --- SCRIPT EXECUTION ---
 
@@ -250,18 +711,30 @@ def run_monitor(run_once=False):
 # The code inside this block only runs when you execute the script directly
 # (e.g., `python monitor.py`), not when it's imported into another script.
 if __name__ == "__main__":
+    # Send log messages to the console with a timestamp. Only INFO and above are shown
+    # unless --debug is given (see below); systemd or cron can capture this output.
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
     # Add a check to ensure the Discord Webhook URL is set and not the placeholder.
     if not DISCORD_WEBHOOK_URL or DISCORD_WEBHOOK_URL == "YOUR_DISCORD_WEBHOOK_URL_HERE":
-        print("[!] FATAL: The DISCORD_WEBHOOK_URL environment variable is not set or is still the default placeholder.")
-        print("[!] Please set it to your Discord webhook URL.")
-        print("[!] Example: export DISCORD_WEBHOOK_URL='https://discord.com/api/webhooks/...'")
+        log.critical("The DISCORD_WEBHOOK_URL environment variable is not set or is still the default placeholder.")
+        log.critical("Please set it to your Discord webhook URL.")
+        log.critical("Example: export DISCORD_WEBHOOK_URL='https://discord.com/api/webhooks/...'")
         sys.exit(1) # Exit with a non-zero status code to indicate an error.
 
     # Set up the argument parser to handle command-line options.
     parser = argparse.ArgumentParser(description="A script to monitor HackerOne's Hacktivity feed and notify on Discord.")
     # Add an optional argument `--once` that, if present, runs the script just one time.
     parser.add_argument("--once", action="store_true", help="Run the monitor a single time and then exit.")
+    # Add an optional argument `--debug` that also shows the detailed progress messages.
+    parser.add_argument("--debug", action="store_true", help="Show detailed progress messages.")
     args = parser.parse_args()
+    if args.debug:
+        logging.getLogger().setLevel(logging.DEBUG)
+
+    # Stop cleanly on Ctrl+C or when a service manager sends SIGTERM.
+    signal.signal(signal.SIGINT, handle_shutdown)
+    signal.signal(signal.SIGTERM, handle_shutdown)
     
-    # Call the main function, passing whether the --once flag was set.
-    run_monitor(run_once=args.once)
+    # Call the main function with the default settings, passing whether the --once flag was set.
+    run_monitor(Config(), run_once=args.once)